@@ -167,7 +167,8 @@ def start_backtesting(args) -> None:
         'BACKTEST_TICKER_INTERVAL': str(args.ticker_interval),
     })
     path = os.path.join(os.path.dirname(__file__), 'tests', 'test_backtesting.py')
-    pytest.main(['-s', path])
+    # run in-process, output of xdist workers would not reach the terminal
+    pytest.main(['-s', '-n', '0', path])
 
 
 # Required json-schema for user specified config
@@ -1,12 +1,50 @@
 # pragma pylint: disable=missing-docstring
+import json
 from datetime import datetime
 from unittest.mock import MagicMock
 
 import pytest
 from jsonschema import validate
+from sqlalchemy import create_engine
 from telegram import Message, Chat, Update
 
+from freqtrade import exchange, main, persistence, rpc
+from freqtrade.analyze import SignalType
 from freqtrade.misc import CONF_SCHEMA
+from freqtrade.persistence import Trade
+
+# Stateless mocks shared by default_mocks, reset before every use instead of rebuilt
+_RPC_INIT = MagicMock()
+_RPC_SEND_MSG = MagicMock()
+_VALIDATE_PAIRS = MagicMock()
+_BUY_OK = MagicMock(return_value='mocked_limit_buy')
+
+
+@pytest.fixture(autouse=True)
+def disable_signal_handlers(mocker):
+    """
+    main.init() registers cleanup() for SIGINT, SIGTERM and SIGABRT,
+    which would exit the test run on ctrl-c without any teardown
+    """
+    mocker.patch.object(main, 'signal')
+
+
+class _Signal:
+    """ Stand-in for main.get_signal, tests flip buy / sell to change its answer """
+    def __init__(self) -> None:
+        self.buy = True
+        self.sell = True
+
+    def __call__(self, pair: str, signal_type: SignalType) -> bool:
+        return self.sell if signal_type == SignalType.SELL else self.buy
+
+
+@pytest.fixture
+def trade_signal(mocker):
+    """ Patches main.get_signal with a _Signal which answers True for buy and sell """
+    stub = _Signal()
+    mocker.patch.object(main, 'get_signal', stub)
+    return stub
 
 
 @pytest.fixture(scope="module")
@@ -51,6 +89,34 @@ def default_conf():
     return configuration
 
 
+@pytest.fixture
+def conf_clone(default_conf):
+    """ Deep copy of the module scoped default_conf for tests which modify it """
+    return json.loads(json.dumps(default_conf))
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    """ In-memory database shared by all tests, the schema is only created once """
+    engine = create_engine('sqlite://')
+    Trade.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def db(db_engine):
+    """
+    Binds Trade to a connection of db_engine inside a transaction,
+    everything the test writes is rolled back afterwards
+    """
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    persistence.init({}, connection)
+    yield connection
+    transaction.rollback()
+    connection.close()
+
+
 @pytest.fixture(scope="module")
 def backtest_conf():
     return {
@@ -112,6 +178,23 @@ def health():
     }])
 
 
+@pytest.fixture
+def default_mocks(default_conf, ticker, health, trade_signal, mocker):
+    """
+    Patches the config, rpc, buy signal and exchange calls needed by most freqtrade.main tests,
+    tests patch whatever they need differently on top of it
+    """
+    for mock in (_RPC_INIT, _RPC_SEND_MSG, _VALIDATE_PAIRS, _BUY_OK):
+        mock.reset_mock()
+    mocker.patch.object(main, '_CONF', default_conf)
+    mocker.patch.multiple(rpc, init=_RPC_INIT, send_msg=_RPC_SEND_MSG)
+    mocker.patch.multiple(exchange,
+                          validate_pairs=_VALIDATE_PAIRS,
+                          get_ticker=ticker,
+                          get_wallet_health=health,
+                          buy=_BUY_OK)
+
+
 @pytest.fixture
 def limit_buy_order():
     return {
@@ -4,13 +4,14 @@
 import logging
 import os
 from typing import Tuple, Dict
+from unittest.mock import patch
 
 import arrow
 import pytest
 from pandas import DataFrame
 from tabulate import tabulate
 
-from freqtrade import exchange
+from freqtrade import exchange, main
 from freqtrade.analyze import parse_ticker_dataframe, populate_indicators, \
     populate_buy_trend, populate_sell_trend
 from freqtrade.exchange import Bittrex
@@ -83,35 +84,35 @@ def generate_text_table(data: Dict[str, Dict], results: DataFrame, stake_currenc
     return tabulate(tabular_data, headers=headers)
 
 
-def backtest(backtest_conf, processed, mocker):
+def backtest(backtest_conf, processed):
     trades = []
     exchange._API = Bittrex({'key': '', 'secret': ''})
-    mocker.patch.dict('freqtrade.main._CONF', backtest_conf)
-    for pair, pair_data in processed.items():
-        pair_data['buy'] = 0
-        pair_data['sell'] = 0
-        ticker = populate_sell_trend(populate_buy_trend(pair_data))
-        # for each buy point
-        for row in ticker[ticker.buy == 1].itertuples(index=True):
-            trade = Trade(
-                open_rate=row.close,
-                open_date=row.date,
-                amount=backtest_conf['stake_amount'],
-                fee=exchange.get_fee() * 2
-            )
-            # calculate win/lose forwards from buy point
-            for row2 in ticker[row.Index:].itertuples(index=True):
-                if min_roi_reached(trade, row2.close, row2.date) or row2.sell == 1:
-                    current_profit = trade.calc_profit(row2.close)
-
-                    trades.append((pair, current_profit, row2.Index - row.Index))
-                    break
+    with patch.object(main, '_CONF', backtest_conf):
+        for pair, pair_data in processed.items():
+            pair_data['buy'] = 0
+            pair_data['sell'] = 0
+            ticker = populate_sell_trend(populate_buy_trend(pair_data))
+            # for each buy point
+            for row in ticker[ticker.buy == 1].itertuples(index=True):
+                trade = Trade(
+                    open_rate=row.close,
+                    open_date=row.date,
+                    amount=backtest_conf['stake_amount'],
+                    fee=exchange.get_fee() * 2
+                )
+                # calculate win/lose forwards from buy point
+                for row2 in ticker[row.Index:].itertuples(index=True):
+                    if min_roi_reached(trade, row2.close, row2.date) or row2.sell == 1:
+                        current_profit = trade.calc_profit(row2.close)
+
+                        trades.append((pair, current_profit, row2.Index - row.Index))
+                        break
     labels = ['currency', 'profit', 'duration']
     return DataFrame.from_records(trades, columns=labels)
 
 
 @pytest.mark.skipif(not os.environ.get('BACKTEST'), reason="BACKTEST not set")
-def test_backtest(backtest_conf, mocker):
+def test_backtest(backtest_conf):
     print('')
     exchange._API = Bittrex({'key': '', 'secret': ''})
 
@@ -147,7 +148,7 @@ def test_backtest(backtest_conf, mocker):
     ))
 
     # Execute backtest and print results
-    results = backtest(config, preprocess(data), mocker)
+    results = backtest(config, preprocess(data))
     print('====================== BACKTESTING REPORT ======================================\n\n'
           'NOTE: This Report doesn\'t respect the limits of max_open_trades, \n'
           '      so the projected values should be taken with a grain of salt.\n')
@@ -1,19 +1,33 @@
 # pragma pylint: disable=missing-docstring,W0212
+import hashlib
+import inspect
 import logging
 import os
-from functools import reduce
+import pickle
+import subprocess
+import tempfile
+import time
+from collections import namedtuple
 from math import exp
-from operator import itemgetter
+from multiprocessing import Pool, get_start_method
+from typing import Dict, List, Tuple
+from unittest.mock import patch
 
+import numpy
+import pandas
 import pytest
-from hyperopt import fmin, tpe, hp, Trials, STATUS_OK
-from pandas import DataFrame
+import talib
+from hyperopt import tpe, hp, space_eval, Trials, STATUS_OK
+from hyperopt.base import Domain, JOB_STATE_DONE, spec_from_misc
+from hyperopt.fmin import FMinIter
+from pandas import DataFrame, Series
 
-from freqtrade import exchange
+from freqtrade import analyze, exchange
 from freqtrade.exchange import Bittrex
 from freqtrade.tests import load_backtesting_data
 from freqtrade.tests.test_backtesting import backtest, format_results
 from freqtrade.tests.test_backtesting import preprocess
+from freqtrade.vendor.qtpylib import indicators as qtpylib
 from freqtrade.vendor.qtpylib.indicators import crossed_above
 
 logging.disable(logging.DEBUG)  # disable debug logs that slow backtesting a lot
@@ -21,143 +35,533 @@ logging.disable(logging.DEBUG)  # disable debug logs that slow backtesting a lot
 # set TARGET_TRADES to suit your number concurrent trades so its realistic to 20days of data
 TARGET_TRADES = 1100
 TOTAL_TRIES = 4
-# pylint: disable=C0103
-current_tries = 0
+# set HYPEROPT_MONGODB (e.g. 127.0.0.1:1234/freqtrade_hyperopt) to evaluate the trials
+# with one hyperopt-mongo-worker per cpu, otherwise they are evaluated by a local process pool
+MONGODB = os.environ.get('HYPEROPT_MONGODB')
+# backtest_conf and processed data used by optimizer(), shared with worker processes through
+# a file whose path test_hyperopt() passes down in this environment variable
+DATA_FILE_ENV = 'FREQTRADE_HYPEROPT_DATA'
+_DATA = {}
+# cached_preprocess() results are loaded with pickle, so keep them where only this user can write
+CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+    'freqtrade'
+)
+
+
+def crossed_above_np(series1: numpy.ndarray, series2) -> numpy.ndarray:
+    """
+    ndarray version of qtpylib's crossed_above()
+    :param series1: ndarray
+    :param series2: ndarray of the same length or scalar
+    :return: boolean ndarray, True where series1 crossed above series2
+    """
+    series2 = numpy.broadcast_to(series2, series1.shape)
+    crossed = numpy.zeros(series1.shape, dtype=bool)
+    crossed[1:] = (series1[1:] > series2[1:]) & (series1[:-1] <= series2[:-1])
+    return crossed
+
+
+IndicatorArrays = namedtuple('IndicatorArrays', [
+    'close', 'open', 'sar', 'adx', 'fastd', 'fastk', 'blower', 'sma', 'tema', 'mfi', 'rsi',
+    'ema5', 'ema10', 'ema50', 'ema100', 'ao', 'macd', 'macdsignal', 'htsine', 'htleadsine',
+])
+# Bounded oscillators that are only compared with a threshold, float32 is precise enough
+# for that and halves the memory traffic. Everything crossed with another column stays
+# float64, float32 would turn near-equal values into ties and flip those crossings.
+FLOAT32_COLUMNS = {'adx', 'mfi', 'rsi'}
+
+
+def indicator_arrays(dataframe: DataFrame) -> IndicatorArrays:
+    """ Extracts the indicator columns used by buy_strategy_generator() as ndarrays """
+    return IndicatorArrays(*(
+        dataframe[name].values.astype(numpy.float32) if name in FLOAT32_COLUMNS
+        else dataframe[name].values
+        for name in IndicatorArrays._fields
+    ))
+
+
+def prepare_arrays() -> None:
+    """ Extracts the IndicatorArrays of every processed pair once, next to the processed data """
+    _DATA['arrays'] = {pair: indicator_arrays(df) for pair, df in _DATA['processed'].items()}
+
+
+def lookup_arrays(dataframe: DataFrame) -> IndicatorArrays:
+    """
+    Returns the IndicatorArrays prepared for the pair of dataframe,
+    DataFrames which are not part of the processed data get theirs extracted on every call
+    """
+    for pair, processed in _DATA.get('processed', {}).items():
+        if processed is dataframe:
+            return _DATA['arrays'][pair]
+    return indicator_arrays(dataframe)
+
+
+# only the trigger selected by the trial gets computed, each call returns a new array
+# which populate_buy_trend modifies in place
+TRIGGERS = {
+    'lower_bb': lambda ia: ia.tema <= ia.blower,
+    'faststoch10': lambda ia: crossed_above_np(ia.fastd, 10.0),
+    'ao_cross_zero': lambda ia: crossed_above_np(ia.ao, 0.0),
+    'ema5_cross_ema10': lambda ia: crossed_above_np(ia.ema5, ia.ema10),
+    'macd_cross_signal': lambda ia: crossed_above_np(ia.macd, ia.macdsignal),
+    'sar_reversal': lambda ia: crossed_above_np(ia.close, ia.sar),
+    'stochf_cross': lambda ia: crossed_above_np(ia.fastk, ia.fastd),
+    'ht_sine': lambda ia: crossed_above_np(ia.htleadsine, ia.htsine),
+}
 
 
 def buy_strategy_generator(params):
+    # the returned function runs once per pair, so resolve the enabled conditions up front
+    # GUARDS AND TRENDS
+    guards = []
+    if params['uptrend_long_ema']['enabled']:
+        guards.append(lambda ia: ia.ema50 > ia.ema100)
+    if params['uptrend_short_ema']['enabled']:
+        guards.append(lambda ia: ia.ema5 > ia.ema10)
+    if params['mfi']['enabled']:
+        mfi = params['mfi']['value']
+        guards.append(lambda ia: ia.mfi < mfi)
+    if params['fastd']['enabled']:
+        fastd = params['fastd']['value']
+        guards.append(lambda ia: ia.fastd < fastd)
+    if params['adx']['enabled']:
+        adx = params['adx']['value']
+        guards.append(lambda ia: ia.adx > adx)
+    if params['rsi']['enabled']:
+        rsi = params['rsi']['value']
+        guards.append(lambda ia: ia.rsi < rsi)
+    if params['over_sar']['enabled']:
+        guards.append(lambda ia: ia.close > ia.sar)
+    if params['green_candle']['enabled']:
+        guards.append(lambda ia: ia.close > ia.open)
+    if params['uptrend_sma']['enabled']:
+        guards.append(lambda ia: numpy.concatenate(([False], ia.sma[1:] > ia.sma[:-1])))
+
+    # TRIGGERS
+    trigger = TRIGGERS[params['trigger']['type']]
+
     def populate_buy_trend(dataframe: DataFrame) -> DataFrame:
-        conditions = []
-        # GUARDS AND TRENDS
-        if params['uptrend_long_ema']['enabled']:
-            conditions.append(dataframe['ema50'] > dataframe['ema100'])
-        if params['uptrend_short_ema']['enabled']:
-            conditions.append(dataframe['ema5'] > dataframe['ema10'])
-        if params['mfi']['enabled']:
-            conditions.append(dataframe['mfi'] < params['mfi']['value'])
-        if params['fastd']['enabled']:
-            conditions.append(dataframe['fastd'] < params['fastd']['value'])
-        if params['adx']['enabled']:
-            conditions.append(dataframe['adx'] > params['adx']['value'])
-        if params['rsi']['enabled']:
-            conditions.append(dataframe['rsi'] < params['rsi']['value'])
-        if params['over_sar']['enabled']:
-            conditions.append(dataframe['close'] > dataframe['sar'])
-        if params['green_candle']['enabled']:
-            conditions.append(dataframe['close'] > dataframe['open'])
-        if params['uptrend_sma']['enabled']:
-            prevsma = dataframe['sma'].shift(1)
-            conditions.append(dataframe['sma'] > prevsma)
-
-        # TRIGGERS
-        triggers = {
-            'lower_bb': dataframe['tema'] <= dataframe['blower'],
-            'faststoch10': (crossed_above(dataframe['fastd'], 10.0)),
-            'ao_cross_zero': (crossed_above(dataframe['ao'], 0.0)),
-            'ema5_cross_ema10': (crossed_above(dataframe['ema5'], dataframe['ema10'])),
-            'macd_cross_signal': (crossed_above(dataframe['macd'], dataframe['macdsignal'])),
-            'sar_reversal': (crossed_above(dataframe['close'], dataframe['sar'])),
-            'stochf_cross': (crossed_above(dataframe['fastk'], dataframe['fastd'])),
-            'ht_sine': (crossed_above(dataframe['htleadsine'], dataframe['htsine'])),
-        }
-        conditions.append(triggers.get(params['trigger']['type']))
-
-        dataframe.loc[
-            reduce(lambda x, y: x & y, conditions),
-            'buy'] = 1
+        ia = lookup_arrays(dataframe)
+        buy = trigger(ia)
+        for guard in guards:
+            buy &= guard(ia)
+
+        # backtest() resets the buy column, so the mask can be assigned as a whole
+        dataframe['buy'] = buy.astype(int)
 
         return dataframe
     return populate_buy_trend
 
 
-@pytest.mark.skipif(not os.environ.get('BACKTEST', False), reason="BACKTEST not set")
-def test_hyperopt(backtest_conf, mocker):
-    mocked_buy_trend = mocker.patch('freqtrade.tests.test_backtesting.populate_buy_trend')
+def optimizer(params):
+    if not _DATA:
+        # running in a worker process, load what test_hyperopt() dumped
+        with open(os.environ[DATA_FILE_ENV], 'rb') as data_file:
+            _DATA.update(pickle.load(data_file))
+        prepare_arrays()
 
-    backdata = load_backtesting_data()
+    with patch('freqtrade.tests.test_backtesting.populate_buy_trend',
+               buy_strategy_generator(params)):
+        results = backtest(_DATA['backtest_conf'], _DATA['processed'])
+
+    result = format_results(results)
+    if MONGODB:
+        # evaluated by a hyperopt-mongo-worker, report the progress from here
+        print(result, flush=True)
+
+    total_profit = results.profit.sum() * 1000
+    trade_count = len(results.index)
+
+    trade_loss = 1 - 0.35 * exp(-(trade_count - TARGET_TRADES) ** 2 / 10 ** 5.2)
+    profit_loss = max(0, 1 - total_profit / 10000)  # max profit 10000
+
+    return {
+        'loss': trade_loss + profit_loss,
+        'status': STATUS_OK,
+        'result': result
+    }
+
+
+SPACE = {
+    'mfi': hp.choice('mfi', [
+        {'enabled': False},
+        {'enabled': True, 'value': hp.quniform('mfi-value', 5, 25, 1)}
+    ]),
+    'fastd': hp.choice('fastd', [
+        {'enabled': False},
+        {'enabled': True, 'value': hp.quniform('fastd-value', 10, 50, 1)}
+    ]),
+    'adx': hp.choice('adx', [
+        {'enabled': False},
+        {'enabled': True, 'value': hp.quniform('adx-value', 15, 50, 1)}
+    ]),
+    'rsi': hp.choice('rsi', [
+        {'enabled': False},
+        {'enabled': True, 'value': hp.quniform('rsi-value', 20, 40, 1)}
+    ]),
+    'uptrend_long_ema': hp.choice('uptrend_long_ema', [
+        {'enabled': False},
+        {'enabled': True}
+    ]),
+    'uptrend_short_ema': hp.choice('uptrend_short_ema', [
+        {'enabled': False},
+        {'enabled': True}
+    ]),
+    'over_sar': hp.choice('over_sar', [
+        {'enabled': False},
+        {'enabled': True}
+    ]),
+    'green_candle': hp.choice('green_candle', [
+        {'enabled': False},
+        {'enabled': True}
+    ]),
+    'uptrend_sma': hp.choice('uptrend_sma', [
+        {'enabled': False},
+        {'enabled': True}
+    ]),
+    'trigger': hp.choice('trigger', [
+        {'type': 'lower_bb'},
+        {'type': 'faststoch10'},
+        {'type': 'ao_cross_zero'},
+        {'type': 'ema5_cross_ema10'},
+        {'type': 'macd_cross_signal'},
+        {'type': 'sar_reversal'},
+        {'type': 'stochf_cross'},
+        {'type': 'ht_sine'},
+    ]),
+}
+
+
+def write_pickle(obj, path: str) -> None:
+    """
+    Pickles obj through a temporary file in the same directory which then replaces path,
+    an interrupted write never leaves a truncated file at path
+    :param obj: object to pickle
+    :param path: destination file
+    :return: None
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            pickle.dump(obj, tmp_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def preprocess_key(backdata: Dict[str, List]) -> str:
+    """
+    Hashes the ticker data together with everything populate_indicators() depends on:
+    the source of analyze and qtpylib's indicators, and the pandas and TA-Lib versions
+    :param backdata: dictionary with backtesting data
+    :return: hex digest
+    """
+    sha1 = hashlib.sha1(inspect.getsource(analyze).encode())
+    sha1.update(inspect.getsource(qtpylib).encode())
+    sha1.update('pandas {} talib {}'.format(pandas.__version__, talib.__version__).encode())
+    sha1.update(pickle.dumps(sorted(backdata.items())))
+    return sha1.hexdigest()
+
+
+def cached_preprocess(backdata: Dict[str, List]) -> Dict[str, DataFrame]:
+    """
+    Same as preprocess(), but caches the result on disk so later runs can skip populating the
+    indicators. See preprocess_key() for what the cache key covers.
+    :param backdata: dictionary with backtesting data
+    :return: dictionary with the processed DataFrame of each pair
+    """
+    path = os.path.join(CACHE_DIR, 'processed_{}.pickle'.format(preprocess_key(backdata)))
+    try:
+        with open(path, 'rb') as cache_file:
+            return pickle.load(cache_file)
+    except Exception:  # pylint: disable=broad-except
+        # not cached yet, truncated or pickled by other library versions, build it again
+        pass
+    os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
     processed = preprocess(backdata)
-    exchange._API = Bittrex({'key': '', 'secret': ''})
+    write_pickle(processed, path)
+    return processed
+
+
+def params_key(params: Dict[str, Dict]) -> Tuple:
+    """
+    Builds a hashable key for the given strategy parameters,
+    disabled guards only contain {'enabled': False} so they do not tell trials apart
+    :param params: parameters as passed to optimizer()
+    :return: tuple
+    """
+    return tuple(sorted((name, tuple(sorted(value.items()))) for name, value in params.items()))
+
 
-    def optimizer(params):
-        mocked_buy_trend.side_effect = buy_strategy_generator(params)
+def dump_data() -> None:
+    """ Dumps backtest_conf and the processed data for optimizer() running in other processes """
+    # the workers extract the IndicatorArrays themselves, that is cheaper than pickling them
+    write_pickle({key: value for key, value in _DATA.items() if key != 'arrays'},
+                 os.environ[DATA_FILE_ENV])
 
-        results = backtest(backtest_conf, processed, mocker)
 
-        result = format_results(results)
+def start_mongo_workers(exp_key: str):
+    """
+    Spawns one hyperopt-mongo-worker per cpu
+    :param exp_key: experiment whose jobs the workers reserve, without it they would also
+    evaluate jobs left queued by earlier runs
+    :return: list of worker processes
+    """
+    dump_data()
+    return [
+        subprocess.Popen([
+            'hyperopt-mongo-worker',
+            '--mongo={}'.format(MONGODB),
+            '--exp-key={}'.format(exp_key),
+            '--poll-interval=0.1',
+        ])
+        for _ in range(os.cpu_count() or 1)
+    ]
 
-        total_profit = results.profit.sum() * 1000
-        trade_count = len(results.index)
 
-        trade_loss = 1 - 0.35 * exp(-(trade_count - TARGET_TRADES) ** 2 / 10 ** 5.2)
-        profit_loss = max(0, 1 - total_profit / 10000)  # max profit 10000
+def run_trials(trials: Trials, processes: int) -> None:
+    """
+    Lets tpe suggest one batch of trials per worker process and evaluates them in parallel
+    until TOTAL_TRIES trials have been done
+    :param trials: Trials instance, results are inserted into it
+    :param processes: number of worker processes
+    :return: None
+    """
+    # forked workers share _DATA including the IndicatorArrays with this process
+    # copy-on-write, so there is nothing to pickle
+    prepare_arrays()
+    if get_start_method() != 'fork':
+        dump_data()
+    domain = Domain(optimizer, SPACE)
+    # tpe suggests the same strategy again from time to time, evaluate every strategy only once
+    results = {}
+    with Pool(processes) as pool:
+        while len(trials) < TOTAL_TRIES:
+            # tids are reserved ahead and do not count trials, number the progress from here
+            n_done = len(trials)
+            # tpe.suggest only returns a doc for the first of the given ids, so ask it once per
+            # process. Every suggestion is inserted as a pending trial before the next one,
+            # tpe treats pending trials as infinite loss and suggests something else.
+            docs = []
+            for _ in range(min(processes, TOTAL_TRIES - n_done)):
+                new_ids = trials.new_trial_ids(1)
+                trials.insert_trial_docs(
+                    tpe.suggest(new_ids, domain, trials, numpy.random.randint(2 ** 31 - 1)))
+                trials.refresh()
+                # insert_trial_docs() stores a copy, update that one once it is evaluated
+                docs.append(trials.trials[-1])
+            keys = []
+            pending = {}
+            for doc in docs:
+                params = space_eval(SPACE, spec_from_misc(doc['misc']))
+                keys.append(params_key(params))
+                if keys[-1] not in results:
+                    pending[keys[-1]] = params
+            results.update(zip(pending.keys(), pool.map(optimizer, pending.values())))
+            for doc, key in zip(docs, keys):
+                doc['state'] = JOB_STATE_DONE
+                doc['result'] = results[key]
+            print('\n'.join(
+                '{:5d}/{}: {}'.format(n_done + i, TOTAL_TRIES, doc['result']['result'])
+                for i, doc in enumerate(docs, start=1)
+            ), flush=True)
+            trials.refresh()
 
-        # pylint: disable=W0603
-        global current_tries
-        current_tries += 1
-        print('{:5d}/{}: {}'.format(current_tries, TOTAL_TRIES, result))
 
-        return {
-            'loss': trade_loss + profit_loss,
-            'status': STATUS_OK,
-            'result': result
-        }
+def run_mongo_trials(exp_key: str):
+    """
+    Evaluates TOTAL_TRIES trials with one hyperopt-mongo-worker per cpu
+    :param exp_key: MongoDB experiment of this run
+    :return: MongoTrials instance with the results
+    """
+    from hyperopt.mongoexp import MongoTrials
+    trials = MongoTrials('mongo://{}/jobs'.format(MONGODB), exp_key=exp_key)
+    workers = start_mongo_workers(exp_key)
+    try:
+        # fmin() queues at most one trial per second, keep one queued for every worker
+        FMinIter(tpe.suggest, Domain(optimizer, SPACE), trials, numpy.random.RandomState(),
+                 max_evals=TOTAL_TRIES, max_queue_len=len(workers),
+                 poll_interval_secs=0.1).exhaust()
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+    return trials
 
+
+def test_crossed_above_np():
+    series1 = Series([1.0, 3.0, 2.0, 5.0, float('nan'), 6.0, 4.0, 7.0])
+    series2 = Series([2.0, 2.0, 3.0, 4.0, 4.0, 4.0, 5.0, 4.0])
+    for other in (series2, 3.0):
+        expected = crossed_above(series1, other).values
+        result = crossed_above_np(series1.values, getattr(other, 'values', other))
+        assert result.tolist() == expected.tolist()
+
+
+@pytest.mark.parametrize('cached', [
+    pickle.dumps({'BTC_ETH': 'stale'})[:-5],  # truncated
+    b'cpandas.core.indexes.gone\nIndex\n.',  # module missing from this pandas version
+    b'cpandas\nNoSuchThing\n.',  # attribute missing from this pandas version
+])
+def test_cached_preprocess_rebuilds_unreadable_cache(cached, tmpdir, mocker):
+    mocker.patch('freqtrade.tests.test_hyperopt.CACHE_DIR', str(tmpdir))
+    mocker.patch('freqtrade.tests.test_hyperopt.preprocess',
+                 return_value={'BTC_ETH': 'processed'})
+    backdata = {'BTC_ETH': [{'C': 1.0}]}
+    path = tmpdir.join('processed_{}.pickle'.format(preprocess_key(backdata)))
+    path.write_binary(cached)
+
+    assert cached_preprocess(backdata) == {'BTC_ETH': 'processed'}
+    assert pickle.loads(path.read_binary()) == {'BTC_ETH': 'processed'}
+    # the temporary file has been moved into place
+    assert tmpdir.listdir() == [path]
+
+
+class _SerialPool:
+    """ Stands in for multiprocessing.Pool in run_trials(), records the size of every batch """
+    def __init__(self) -> None:
+        self.batches = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+    def map(self, func, iterable) -> List:
+        args = list(iterable)
+        self.batches.append(len(args))
+        return [func(arg) for arg in args]
+
+
+def _quadratic_optimizer(params):
+    return {
+        'loss': (params['x']['value'] - 3) ** 2,
+        'status': STATUS_OK,
+        'result': 'x = {}'.format(params['x']['value'])
+    }
+
+
+def test_run_trials_full_batches(tmpdir, mocker, capsys):
+    pool = _SerialPool()
+    # only written when the start method is not fork
+    mocker.patch.dict(os.environ, {DATA_FILE_ENV: str(tmpdir.join('data.pickle'))})
+    mocker.patch('freqtrade.tests.test_hyperopt.Pool', lambda processes: pool)
+    mocker.patch('freqtrade.tests.test_hyperopt.optimizer', _quadratic_optimizer)
+    mocker.patch('freqtrade.tests.test_hyperopt.SPACE',
+                 {'x': {'value': hp.uniform('x', -10, 10)}})
+    mocker.patch('freqtrade.tests.test_hyperopt.TOTAL_TRIES', 40)
+    mocker.patch.dict('freqtrade.tests.test_hyperopt._DATA', {'processed': {}})
+
+    trials = Trials()
+    run_trials(trials, 8)
+
+    # tpe takes over from random search after 20 trials, its rounds have to be full as well
+    assert pool.batches == [8] * 5
+    assert len(trials) == 40
+    assert all(doc['state'] == JOB_STATE_DONE for doc in trials.trials)
+    progress = [line.split(':')[0].strip() for line in capsys.readouterr().out.splitlines()]
+    assert progress == ['{}/40'.format(i) for i in range(1, 41)]
+
+
+def test_run_trials_evaluates_repeated_strategies_once(tmpdir, mocker):
     space = {
-        'mfi': hp.choice('mfi', [
-            {'enabled': False},
-            {'enabled': True, 'value': hp.quniform('mfi-value', 5, 25, 1)}
-        ]),
-        'fastd': hp.choice('fastd', [
-            {'enabled': False},
-            {'enabled': True, 'value': hp.quniform('fastd-value', 10, 50, 1)}
-        ]),
-        'adx': hp.choice('adx', [
-            {'enabled': False},
-            {'enabled': True, 'value': hp.quniform('adx-value', 15, 50, 1)}
-        ]),
-        'rsi': hp.choice('rsi', [
-            {'enabled': False},
-            {'enabled': True, 'value': hp.quniform('rsi-value', 20, 40, 1)}
-        ]),
-        'uptrend_long_ema': hp.choice('uptrend_long_ema', [
-            {'enabled': False},
-            {'enabled': True}
-        ]),
-        'uptrend_short_ema': hp.choice('uptrend_short_ema', [
-            {'enabled': False},
-            {'enabled': True}
-        ]),
-        'over_sar': hp.choice('over_sar', [
-            {'enabled': False},
-            {'enabled': True}
-        ]),
-        'green_candle': hp.choice('green_candle', [
-            {'enabled': False},
-            {'enabled': True}
-        ]),
-        'uptrend_sma': hp.choice('uptrend_sma', [
-            {'enabled': False},
-            {'enabled': True}
-        ]),
-        'trigger': hp.choice('trigger', [
-            {'type': 'lower_bb'},
-            {'type': 'faststoch10'},
-            {'type': 'ao_cross_zero'},
-            {'type': 'ema5_cross_ema10'},
-            {'type': 'macd_cross_signal'},
-            {'type': 'sar_reversal'},
-            {'type': 'stochf_cross'},
-            {'type': 'ht_sine'},
-        ]),
+        'rsi': hp.choice('rsi', [{'enabled': False}, {'enabled': True}]),
+        'adx': hp.choice('adx', [{'enabled': False}, {'enabled': True}]),
     }
+    evaluated = []
+
+    def counting_optimizer(params):
+        evaluated.append(params_key(params))
+        return {'loss': len(evaluated), 'status': STATUS_OK, 'result': len(evaluated)}
+
+    pool = _SerialPool()
+    mocker.patch('freqtrade.tests.test_hyperopt.Pool', lambda processes: pool)
+    mocker.patch('freqtrade.tests.test_hyperopt.optimizer', counting_optimizer)
+    mocker.patch('freqtrade.tests.test_hyperopt.SPACE', space)
+    mocker.patch('freqtrade.tests.test_hyperopt.TOTAL_TRIES', 12)
+    mocker.patch.dict('freqtrade.tests.test_hyperopt._DATA', {'processed': {}})
+    mocker.patch.dict(os.environ, {DATA_FILE_ENV: str(tmpdir.join('data.pickle'))})
+
     trials = Trials()
-    best = fmin(fn=optimizer, space=space, algo=tpe.suggest, max_evals=TOTAL_TRIES, trials=trials)
+    run_trials(trials, 4)
+
+    # 12 trials over 4 possible strategies, each strategy is only backtested once
+    assert len(trials) == 12
+    assert len(evaluated) == len(set(evaluated))
+    assert sum(pool.batches) == len(evaluated)
+    results = {}
+    for doc in trials.trials:
+        assert doc['state'] == JOB_STATE_DONE
+        key = params_key(space_eval(space, spec_from_misc(doc['misc'])))
+        assert doc['result'] == results.setdefault(key, doc['result'])
+    assert set(results) == set(evaluated)
+
+
+def test_run_mongo_trials(tmpdir, mocker):
+    mocker.patch('freqtrade.tests.test_hyperopt.MONGODB', '127.0.0.1:1234/freqtrade')
+    mocker.patch.dict(os.environ, {DATA_FILE_ENV: str(tmpdir.join('data.pickle'))})
+    mocker.patch.dict('freqtrade.tests.test_hyperopt._DATA', {'processed': {}})
+    mocker.patch('os.cpu_count', return_value=3)
+    trials_mock = mocker.patch('hyperopt.mongoexp.MongoTrials')
+    popen_mock = mocker.patch('subprocess.Popen')
+    fmin_iter_mock = mocker.patch('freqtrade.tests.test_hyperopt.FMinIter')
+
+    trials = run_mongo_trials('run-1')
+
+    assert trials is trials_mock.return_value
+    trials_mock.assert_called_once_with('mongo://127.0.0.1:1234/freqtrade/jobs', exp_key='run-1')
+    # the workers need the data and may only reserve jobs of this run
+    assert tmpdir.join('data.pickle').check()
+    assert popen_mock.call_count == 3
+    popen_mock.assert_called_with([
+        'hyperopt-mongo-worker',
+        '--mongo=127.0.0.1:1234/freqtrade',
+        '--exp-key=run-1',
+        '--poll-interval=0.1',
+    ])
+    args, kwargs = fmin_iter_mock.call_args
+    assert args[0] is tpe.suggest
+    assert args[2] is trials
+    assert kwargs['max_evals'] == TOTAL_TRIES
+    assert kwargs['max_queue_len'] == 3
+    fmin_iter_mock.return_value.exhaust.assert_called_once_with()
+    assert popen_mock.return_value.terminate.call_count == 3
+    assert popen_mock.return_value.wait.call_count == 3
+
+
+@pytest.mark.skipif(not os.environ.get('BACKTEST', False), reason="BACKTEST not set")
+def test_hyperopt(backtest_conf):
+    backdata = load_backtesting_data()
+    _DATA.update(backtest_conf=backtest_conf, processed=cached_preprocess(backdata))
+    exchange._API = Bittrex({'key': '', 'secret': ''})
+
+    # unique per run and only accessible by this user, removed even if the run fails
+    data_fd, data_file = tempfile.mkstemp(prefix='freqtrade_hyperopt_', suffix='.pickle')
+    os.close(data_fd)
+    try:
+        # inherited by the pool and mongo workers started below
+        os.environ[DATA_FILE_ENV] = data_file
+        if MONGODB:
+            # a new experiment for every run, trials of an earlier run would count towards
+            # TOTAL_TRIES and their best could be reported for changed data or strategy
+            trials = run_mongo_trials(
+                '{}-{}'.format(preprocess_key(backdata), int(time.time())))
+        else:
+            trials = Trials()
+            run_trials(trials, os.cpu_count() or 1)
+    finally:
+        del os.environ[DATA_FILE_ENV]
+        os.remove(data_file)
+    best = trials.argmin
     print('\n\n\n\n==================== HYPEROPT BACKTESTING REPORT ==============================')
     print('Best parameters {}'.format(best))
-    newlist = sorted(trials.results, key=itemgetter('loss'))
-    print('Result: {}'.format(newlist[0]['result']))
+    print('Result: {}'.format(trials.best_trial['result']['result']))
 
 
 if __name__ == '__main__':
     # for profiling with cProfile and line_profiler
-    pytest.main([__file__, '-s'])
+    pytest.main([__file__, '-s', '-n', '0'])
@@ -1,37 +1,48 @@
 # pragma pylint: disable=missing-docstring,C0103
-import copy
+import re
 from unittest.mock import MagicMock
 
 import pytest
 import requests
-from sqlalchemy import create_engine
+from sqlalchemy.ext import baked
 
+from freqtrade import exchange, main, rpc
 from freqtrade.exchange import Exchanges
-from freqtrade.analyze import SignalType
 from freqtrade.main import create_trade, handle_trade, init, \
     get_target_bid, _process
 from freqtrade.misc import get_state, State, FreqtradeException
 from freqtrade.persistence import Trade
 
+# Trade lookups are baked so their SQL is only compiled once per worker
+_BAKERY = baked.bakery()
+_OPEN_TRADES = _BAKERY(lambda session: session.query(Trade))
+_OPEN_TRADES += lambda query: query.filter(Trade.is_open.is_(True))
+_CLOSED_TRADES = _BAKERY(lambda session: session.query(Trade))
+_CLOSED_TRADES += lambda query: query.filter(Trade.is_open.is_(False))
 
-def test_process_trade_creation(default_conf, ticker, health, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch.multiple('freqtrade.rpc', init=MagicMock(), send_msg=MagicMock())
-    mocker.patch('freqtrade.main.get_signal', side_effect=lambda s, t: True)
-    mocker.patch.multiple('freqtrade.main.exchange',
-                          validate_pairs=MagicMock(),
-                          get_ticker=ticker,
-                          get_wallet_health=health,
-                          buy=MagicMock(return_value='mocked_limit_buy'))
-    init(default_conf, create_engine('sqlite://'))
+# pytest.raises uses re.search, so the patterns need no surrounding .*
+_RE_STAKE = re.compile(r'stake amount')
+_RE_NOPAIR = re.compile(r'No pair in whitelist')
+_RE_CLOSED = re.compile(r'closed trade')
 
-    trades = Trade.query.filter(Trade.is_open.is_(True)).all()
+# Stub return values, patched in as plain callables where calls are not asserted
+_TICKER_SELL = {
+    'bid': 0.17256061,
+    'ask': 0.172661,
+    'last': 0.17256061
+}
+
+
+def test_process_trade_creation(default_conf, default_mocks, db):
+    init(default_conf, db)
+
+    trades = _OPEN_TRADES(Trade.session).all()
     assert not trades
 
     result = _process()
     assert result is True
 
-    trades = Trade.query.filter(Trade.is_open.is_(True)).all()
+    trades = _OPEN_TRADES(Trade.session).all()
     assert len(trades) == 1
     trade = trades[0]
     assert trade is not None
@@ -43,33 +54,20 @@ def test_process_trade_creation(default_conf, ticker, health, mocker):
     assert trade.amount == 0.6864067381401302
 
 
-def test_process_exchange_failures(default_conf, ticker, health, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch.multiple('freqtrade.rpc', init=MagicMock(), send_msg=MagicMock())
-    mocker.patch('freqtrade.main.get_signal', side_effect=lambda s, t: True)
-    sleep_mock = mocker.patch('time.sleep', side_effect=lambda _: None)
-    mocker.patch.multiple('freqtrade.main.exchange',
-                          validate_pairs=MagicMock(),
-                          get_ticker=ticker,
-                          get_wallet_health=health,
-                          buy=MagicMock(side_effect=requests.exceptions.RequestException))
-    init(default_conf, create_engine('sqlite://'))
+def test_process_exchange_failures(default_conf, default_mocks, db, mocker):
+    time_mock = mocker.patch.object(main, 'time')
+    mocker.patch.object(exchange, 'buy',
+                        MagicMock(side_effect=requests.exceptions.RequestException))
+    init(default_conf, db)
     result = _process()
     assert result is False
-    assert sleep_mock.has_calls()
-
-
-def test_process_runtime_error(default_conf, ticker, health, mocker):
-    msg_mock = MagicMock()
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch.multiple('freqtrade.rpc', init=MagicMock(), send_msg=msg_mock)
-    mocker.patch('freqtrade.main.get_signal', side_effect=lambda s, t: True)
-    mocker.patch.multiple('freqtrade.main.exchange',
-                          validate_pairs=MagicMock(),
-                          get_ticker=ticker,
-                          get_wallet_health=health,
-                          buy=MagicMock(side_effect=RuntimeError))
-    init(default_conf, create_engine('sqlite://'))
+    time_mock.sleep.assert_called_once_with(30)
+
+
+def test_process_runtime_error(default_conf, default_mocks, db, mocker):
+    msg_mock = mocker.patch.object(rpc, 'send_msg', MagicMock())
+    mocker.patch.object(exchange, 'buy', MagicMock(side_effect=RuntimeError))
+    init(default_conf, db)
     assert get_state() == State.RUNNING
 
     result = _process()
@@ -78,42 +76,28 @@ def test_process_runtime_error(default_conf, ticker, health, mocker):
     assert 'RuntimeError' in msg_mock.call_args_list[-1][0][0]
 
 
-def test_process_trade_handling(default_conf, ticker, limit_buy_order, health, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch.multiple('freqtrade.rpc', init=MagicMock(), send_msg=MagicMock())
-    mocker.patch('freqtrade.main.get_signal',
-                 side_effect=lambda *args: False if args[1] == SignalType.SELL else True)
-    mocker.patch.multiple('freqtrade.main.exchange',
-                          validate_pairs=MagicMock(),
-                          get_ticker=ticker,
-                          get_wallet_health=health,
-                          buy=MagicMock(return_value='mocked_limit_buy'),
-                          get_order=MagicMock(return_value=limit_buy_order))
-    init(default_conf, create_engine('sqlite://'))
-
-    trades = Trade.query.filter(Trade.is_open.is_(True)).all()
+def test_process_trade_handling(default_conf, limit_buy_order, default_mocks, trade_signal, db,
+                                mocker):
+    trade_signal.sell = False
+    mocker.patch.object(exchange, 'get_order', lambda *_: limit_buy_order)
+    init(default_conf, db)
+
+    trades = _OPEN_TRADES(Trade.session).all()
     assert not trades
     result = _process()
     assert result is True
-    trades = Trade.query.filter(Trade.is_open.is_(True)).all()
+    trades = _OPEN_TRADES(Trade.session).all()
     assert len(trades) == 1
 
     result = _process()
     assert result is False
 
 
-def test_create_trade(default_conf, ticker, limit_buy_order, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch('freqtrade.main.get_signal', side_effect=lambda s, t: True)
-    mocker.patch.multiple('freqtrade.rpc', init=MagicMock(), send_msg=MagicMock())
-    mocker.patch.multiple('freqtrade.main.exchange',
-                          validate_pairs=MagicMock(),
-                          get_ticker=ticker,
-                          buy=MagicMock(return_value='mocked_limit_buy'))
+def test_create_trade(default_conf, limit_buy_order, default_mocks, db):
     # Save state of current whitelist
-    whitelist = copy.deepcopy(default_conf['exchange']['pair_whitelist'])
+    whitelist = list(default_conf['exchange']['pair_whitelist'])
 
-    init(default_conf, create_engine('sqlite://'))
+    init(default_conf, db)
     trade = create_trade(15.0)
     Trade.session.add(trade)
     Trade.session.flush()
@@ -132,54 +116,33 @@ def test_create_trade(default_conf, ticker, limit_buy_order, mocker):
     assert whitelist == default_conf['exchange']['pair_whitelist']
 
 
-def test_create_trade_no_stake_amount(default_conf, ticker, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch('freqtrade.main.get_signal', side_effect=lambda s, t: True)
-    mocker.patch.multiple('freqtrade.rpc', init=MagicMock(), send_msg=MagicMock())
-    mocker.patch.multiple('freqtrade.main.exchange',
-                          validate_pairs=MagicMock(),
-                          get_ticker=ticker,
-                          buy=MagicMock(return_value='mocked_limit_buy'),
-                          get_balance=MagicMock(return_value=default_conf['stake_amount'] * 0.5))
-    with pytest.raises(FreqtradeException, match=r'.*stake amount.*'):
+def test_create_trade_no_stake_amount(default_conf, default_mocks, mocker):
+    mocker.patch.object(exchange, 'get_balance',
+                        lambda *_: default_conf['stake_amount'] * 0.5)
+    with pytest.raises(FreqtradeException, match=_RE_STAKE):
         create_trade(default_conf['stake_amount'])
 
 
-def test_create_trade_no_pairs(default_conf, ticker, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch('freqtrade.main.get_signal', side_effect=lambda s, t: True)
-    mocker.patch.multiple('freqtrade.rpc', init=MagicMock(), send_msg=MagicMock())
-    mocker.patch.multiple('freqtrade.main.exchange',
-                          validate_pairs=MagicMock(),
-                          get_ticker=ticker,
-                          buy=MagicMock(return_value='mocked_limit_buy'))
-
-    with pytest.raises(FreqtradeException, match=r'.*No pair in whitelist.*'):
-        conf = copy.deepcopy(default_conf)
-        conf['exchange']['pair_whitelist'] = []
-        mocker.patch.dict('freqtrade.main._CONF', conf)
+def test_create_trade_no_pairs(default_conf, conf_clone, default_mocks, db, mocker):
+    conf_clone['exchange']['pair_whitelist'] = []
+    mocker.patch.object(main, '_CONF', conf_clone)
+    # get_balance() reads dry_run from the exchange config, which only init() fills otherwise
+    mocker.patch.object(exchange, '_CONF', conf_clone)
+    with pytest.raises(FreqtradeException, match=_RE_NOPAIR):
         create_trade(default_conf['stake_amount'])
 
 
-def test_handle_trade(default_conf, limit_buy_order, limit_sell_order, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch('freqtrade.main.get_signal', side_effect=lambda s, t: True)
-    mocker.patch.multiple('freqtrade.rpc', init=MagicMock(), send_msg=MagicMock())
-    mocker.patch.multiple('freqtrade.main.exchange',
-                          validate_pairs=MagicMock(),
-                          get_ticker=MagicMock(return_value={
-                              'bid': 0.17256061,
-                              'ask': 0.172661,
-                              'last': 0.17256061
-                          }),
-                          buy=MagicMock(return_value='mocked_limit_buy'),
-                          sell=MagicMock(return_value='mocked_limit_sell'))
-    init(default_conf, create_engine('sqlite://'))
+def test_handle_trade(default_conf, limit_buy_order, limit_sell_order, default_mocks, db,
+                      mocker):
+    mocker.patch.multiple(exchange,
+                          get_ticker=lambda *_: _TICKER_SELL,
+                          sell=lambda *_: 'mocked_limit_sell')
+    init(default_conf, db)
     trade = create_trade(15.0)
     trade.update(limit_buy_order)
     Trade.session.add(trade)
     Trade.session.flush()
-    trade = Trade.query.filter(Trade.is_open.is_(True)).first()
+    trade = _OPEN_TRADES(Trade.session).first()
     assert trade
 
     handle_trade(trade)
@@ -193,41 +156,29 @@ def test_handle_trade(default_conf, limit_buy_order, limit_sell_order, mocker):
     assert trade.close_date is not None
 
 
-def test_close_trade(default_conf, ticker, limit_buy_order, limit_sell_order, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch('freqtrade.main.get_signal', side_effect=lambda s, t: True)
-    mocker.patch.multiple('freqtrade.rpc', init=MagicMock(), send_msg=MagicMock())
-    mocker.patch.multiple('freqtrade.main.exchange',
-                          validate_pairs=MagicMock(),
-                          get_ticker=ticker,
-                          buy=MagicMock(return_value='mocked_limit_buy'))
-
+def test_close_trade(default_conf, limit_buy_order, limit_sell_order, default_mocks, db):
     # Create trade and sell it
-    init(default_conf, create_engine('sqlite://'))
+    init(default_conf, db)
     trade = create_trade(15.0)
     Trade.session.add(trade)
     trade.update(limit_buy_order)
-    trade = Trade.query.filter(Trade.is_open.is_(True)).first()
+    trade = _OPEN_TRADES(Trade.session).first()
     assert trade
 
     trade.update(limit_sell_order)
-    trade = Trade.query.filter(Trade.is_open.is_(False)).first()
+    trade = _CLOSED_TRADES(Trade.session).first()
     assert trade
 
-    with pytest.raises(ValueError, match=r'.*closed trade.*'):
+    with pytest.raises(ValueError, match=_RE_CLOSED):
         handle_trade(trade)
 
 
-def test_balance_fully_ask_side(mocker):
-    mocker.patch.dict('freqtrade.main._CONF', {'bid_strategy': {'ask_last_balance': 0.0}})
-    assert get_target_bid({'ask': 20, 'last': 10}) == 20
-
-
-def test_balance_fully_last_side(mocker):
-    mocker.patch.dict('freqtrade.main._CONF', {'bid_strategy': {'ask_last_balance': 1.0}})
-    assert get_target_bid({'ask': 20, 'last': 10}) == 10
-
-
-def test_balance_bigger_last_ask(mocker):
-    mocker.patch.dict('freqtrade.main._CONF', {'bid_strategy': {'ask_last_balance': 1.0}})
-    assert get_target_bid({'ask': 5, 'last': 10}) == 5
+@pytest.mark.parametrize('ask_last_balance,ticker,expected', [
+    (0.0, {'ask': 20, 'last': 10}, 20),  # fully ask side
+    (1.0, {'ask': 20, 'last': 10}, 10),  # fully last side
+    (1.0, {'ask': 5, 'last': 10}, 5),  # last bigger than ask
+])
+def test_get_target_bid(ask_last_balance, ticker, expected, mocker):
+    mocker.patch.object(main, '_CONF',
+                        {'bid_strategy': {'ask_last_balance': ask_last_balance}})
+    assert get_target_bid(ticker) == expected
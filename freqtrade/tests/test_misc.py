@@ -121,7 +121,8 @@ def test_start_backtesting(mocker):
 
     main_call_args = pytest_mock.call_args[0][0]
     assert main_call_args[0] == '-s'
-    assert main_call_args[1].endswith(os.path.join('freqtrade', 'tests', 'test_backtesting.py'))
+    assert main_call_args[1:3] == ['-n', '0']
+    assert main_call_args[3].endswith(os.path.join('freqtrade', 'tests', 'test_backtesting.py'))
 
 
 def test_load_config(default_conf, mocker):
@@ -17,16 +17,16 @@ from freqtrade.rpc.telegram import authorized_only, is_enabled, send_msg, _statu
     _profit, _forcesell, _performance, _count, _start, _stop, _balance, _version, _help
 
 
-def test_is_enabled(default_conf, mocker):
-    mocker.patch.dict('freqtrade.rpc.telegram._CONF', default_conf)
-    default_conf['telegram']['enabled'] = False
+def test_is_enabled(conf_clone, mocker):
+    mocker.patch.dict('freqtrade.rpc.telegram._CONF', conf_clone)
+    conf_clone['telegram']['enabled'] = False
     assert is_enabled() is False
 
 
-def test_init_disabled(default_conf, mocker):
-    mocker.patch.dict('freqtrade.rpc.telegram._CONF', default_conf)
-    default_conf['telegram']['enabled'] = False
-    telegram.init(default_conf)
+def test_init_disabled(conf_clone, mocker):
+    mocker.patch.dict('freqtrade.rpc.telegram._CONF', conf_clone)
+    conf_clone['telegram']['enabled'] = False
+    telegram.init(conf_clone)
 
 
 def test_authorized_only(default_conf, mocker):
@@ -74,9 +74,8 @@ def test_authorized_only_exception(default_conf, mocker):
     dummy_handler(MagicMock(), update)
 
 
-def test_status_handle(default_conf, update, ticker, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch('freqtrade.main.get_signal', side_effect=lambda s, t: True)
+def test_status_handle(default_conf, update, ticker, trade_signal, mocker):
+    mocker.patch('freqtrade.main._CONF', default_conf)
     msg_mock = MagicMock()
     mocker.patch('freqtrade.main.rpc.send_msg', MagicMock())
     mocker.patch.multiple('freqtrade.rpc.telegram',
@@ -113,9 +112,8 @@ def test_status_handle(default_conf, update, ticker, mocker):
     assert '[BTC_ETH]' in msg_mock.call_args_list[0][0][0]
 
 
-def test_status_table_handle(default_conf, update, ticker, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch('freqtrade.main.get_signal', side_effect=lambda s, t: True)
+def test_status_table_handle(default_conf, update, ticker, trade_signal, mocker):
+    mocker.patch('freqtrade.main._CONF', default_conf)
     msg_mock = MagicMock()
     mocker.patch('freqtrade.main.rpc.send_msg', MagicMock())
     mocker.patch.multiple(
@@ -157,9 +155,9 @@ def test_status_table_handle(default_conf, update, ticker, mocker):
     assert msg_mock.call_count == 1
 
 
-def test_profit_handle(default_conf, update, ticker, limit_buy_order, limit_sell_order, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch('freqtrade.main.get_signal', side_effect=lambda s, t: True)
+def test_profit_handle(
+        default_conf, update, ticker, limit_buy_order, limit_sell_order, trade_signal, mocker):
+    mocker.patch('freqtrade.main._CONF', default_conf)
     msg_mock = MagicMock()
     mocker.patch('freqtrade.main.rpc.send_msg', MagicMock())
     mocker.patch.multiple('freqtrade.rpc.telegram',
@@ -198,13 +196,13 @@ def test_profit_handle(default_conf, update, ticker, limit_buy_order, limit_sell
 
     _profit(bot=MagicMock(), update=update)
     assert msg_mock.call_count == 1
-    assert '*ROI:* `1.50701325 (10.05%)`' in msg_mock.call_args_list[-1][0][0]
-    assert 'Best Performing:* `BTC_ETH: 10.05%`' in msg_mock.call_args_list[-1][0][0]
+    msg = msg_mock.call_args_list[-1][0][0]
+    assert '*ROI:* `1.50701325 (10.05%)`' in msg
+    assert 'Best Performing:* `BTC_ETH: 10.05%`' in msg
 
 
-def test_forcesell_handle(default_conf, update, ticker, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch('freqtrade.main.get_signal', side_effect=lambda s, t: True)
+def test_forcesell_handle(default_conf, update, ticker, trade_signal, mocker):
+    mocker.patch('freqtrade.main._CONF', default_conf)
     rpc_mock = mocker.patch('freqtrade.main.rpc.send_msg', MagicMock())
     mocker.patch.multiple('freqtrade.rpc.telegram',
                           _CONF=default_conf,
@@ -226,13 +224,13 @@ def test_forcesell_handle(default_conf, update, ticker, mocker):
     _forcesell(bot=MagicMock(), update=update)
 
     assert rpc_mock.call_count == 2
-    assert 'Selling [BTC/ETH]' in rpc_mock.call_args_list[-1][0][0]
-    assert '0.07256061 (profit: ~-0.64%)' in rpc_mock.call_args_list[-1][0][0]
+    msg = rpc_mock.call_args_list[-1][0][0]
+    assert 'Selling [BTC/ETH]' in msg
+    assert '0.07256061 (profit: ~-0.64%)' in msg
 
 
-def test_forcesell_all_handle(default_conf, update, ticker, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch('freqtrade.main.get_signal', side_effect=lambda s, t: True)
+def test_forcesell_all_handle(default_conf, update, ticker, trade_signal, mocker):
+    mocker.patch('freqtrade.main._CONF', default_conf)
     rpc_mock = mocker.patch('freqtrade.main.rpc.send_msg', MagicMock())
     mocker.patch.multiple('freqtrade.rpc.telegram',
                           _CONF=default_conf,
@@ -257,9 +255,8 @@ def test_forcesell_all_handle(default_conf, update, ticker, mocker):
         assert '0.07256061 (profit: ~-0.64%)' in args[0][0]
 
 
-def test_forcesell_handle_invalid(default_conf, update, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch('freqtrade.main.get_signal', side_effect=lambda s, t: True)
+def test_forcesell_handle_invalid(default_conf, update, trade_signal, mocker):
+    mocker.patch('freqtrade.main._CONF', default_conf)
     msg_mock = MagicMock()
     mocker.patch.multiple('freqtrade.rpc.telegram',
                           _CONF=default_conf,
@@ -294,9 +291,8 @@ def test_forcesell_handle_invalid(default_conf, update, mocker):
 
 
 def test_performance_handle(
-        default_conf, update, ticker, limit_buy_order, limit_sell_order, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch('freqtrade.main.get_signal', side_effect=lambda s, t: True)
+        default_conf, update, ticker, limit_buy_order, limit_sell_order, trade_signal, mocker):
+    mocker.patch('freqtrade.main._CONF', default_conf)
     msg_mock = MagicMock()
     mocker.patch('freqtrade.main.rpc.send_msg', MagicMock())
     mocker.patch.multiple('freqtrade.rpc.telegram',
@@ -325,13 +321,13 @@ def test_performance_handle(
 
     _performance(bot=MagicMock(), update=update)
     assert msg_mock.call_count == 1
-    assert 'Performance' in msg_mock.call_args_list[0][0][0]
-    assert '<code>BTC_ETH\t10.05%</code>' in msg_mock.call_args_list[0][0][0]
+    msg = msg_mock.call_args_list[0][0][0]
+    assert 'Performance' in msg
+    assert '<code>BTC_ETH\t10.05%</code>' in msg
 
 
-def test_count_handle(default_conf, update, ticker, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch('freqtrade.main.get_signal', side_effect=lambda s, t: True)
+def test_count_handle(default_conf, update, ticker, trade_signal, mocker):
+    mocker.patch('freqtrade.main._CONF', default_conf)
     msg_mock = MagicMock()
     mocker.patch.multiple(
         'freqtrade.rpc.telegram',
@@ -363,9 +359,8 @@ def test_count_handle(default_conf, update, ticker, mocker):
     assert msg in msg_mock.call_args_list[0][0][0]
 
 
-def test_performance_handle_invalid(default_conf, update, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
-    mocker.patch('freqtrade.main.get_signal', side_effect=lambda s, t: True)
+def test_performance_handle_invalid(default_conf, update, trade_signal, mocker):
+    mocker.patch('freqtrade.main._CONF', default_conf)
     msg_mock = MagicMock()
     mocker.patch.multiple('freqtrade.rpc.telegram',
                           _CONF=default_conf,
@@ -383,7 +378,7 @@ def test_performance_handle_invalid(default_conf, update, mocker):
 
 
 def test_start_handle(default_conf, update, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
+    mocker.patch('freqtrade.main._CONF', default_conf)
     msg_mock = MagicMock()
     mocker.patch.multiple('freqtrade.rpc.telegram',
                           _CONF=default_conf,
@@ -401,7 +396,7 @@ def test_start_handle(default_conf, update, mocker):
 
 
 def test_start_handle_already_running(default_conf, update, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
+    mocker.patch('freqtrade.main._CONF', default_conf)
     msg_mock = MagicMock()
     mocker.patch.multiple('freqtrade.rpc.telegram',
                           _CONF=default_conf,
@@ -420,7 +415,7 @@ def test_start_handle_already_running(default_conf, update, mocker):
 
 
 def test_stop_handle(default_conf, update, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
+    mocker.patch('freqtrade.main._CONF', default_conf)
     msg_mock = MagicMock()
     mocker.patch.multiple('freqtrade.rpc.telegram',
                           _CONF=default_conf,
@@ -439,7 +434,7 @@ def test_stop_handle(default_conf, update, mocker):
 
 
 def test_stop_handle_already_stopped(default_conf, update, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
+    mocker.patch('freqtrade.main._CONF', default_conf)
     msg_mock = MagicMock()
     mocker.patch.multiple('freqtrade.rpc.telegram',
                           _CONF=default_conf,
@@ -471,7 +466,7 @@ def test_balance_handle(default_conf, update, mocker):
         'Pending': 0.0,
         'CryptoAddress': 'XXXX',
     }]
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
+    mocker.patch('freqtrade.main._CONF', default_conf)
     msg_mock = MagicMock()
     mocker.patch.multiple('freqtrade.rpc.telegram',
                           _CONF=default_conf,
@@ -482,12 +477,13 @@ def test_balance_handle(default_conf, update, mocker):
 
     _balance(bot=MagicMock(), update=update)
     assert msg_mock.call_count == 1
-    assert '*Currency*: BTC' in msg_mock.call_args_list[0][0][0]
-    assert 'Balance' in msg_mock.call_args_list[0][0][0]
+    msg = msg_mock.call_args_list[0][0][0]
+    assert '*Currency*: BTC' in msg
+    assert 'Balance' in msg
 
 
 def test_help_handle(default_conf, update, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
+    mocker.patch('freqtrade.main._CONF', default_conf)
     msg_mock = MagicMock()
     mocker.patch.multiple('freqtrade.rpc.telegram',
                           _CONF=default_conf,
@@ -500,7 +496,7 @@ def test_help_handle(default_conf, update, mocker):
 
 
 def test_version_handle(default_conf, update, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
+    mocker.patch('freqtrade.main._CONF', default_conf)
     msg_mock = MagicMock()
     mocker.patch.multiple('freqtrade.rpc.telegram',
                           _CONF=default_conf,
@@ -512,27 +508,28 @@ def test_version_handle(default_conf, update, mocker):
     assert '*Version:* `{}`'.format(__version__) in msg_mock.call_args_list[0][0][0]
 
 
-def test_send_msg(default_conf, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
+def test_send_msg(conf_clone, mocker):
+    mocker.patch('freqtrade.main._CONF', conf_clone)
     mocker.patch.multiple('freqtrade.rpc.telegram',
-                          _CONF=default_conf,
+                          _CONF=conf_clone,
                           init=MagicMock())
+    conf_clone['telegram']['enabled'] = False
     bot = MagicMock()
     send_msg('test', bot)
     assert not bot.method_calls
     bot.reset_mock()
 
-    default_conf['telegram']['enabled'] = True
+    conf_clone['telegram']['enabled'] = True
     send_msg('test', bot)
     assert len(bot.method_calls) == 1
 
 
-def test_send_msg_network_error(default_conf, mocker):
-    mocker.patch.dict('freqtrade.main._CONF', default_conf)
+def test_send_msg_network_error(conf_clone, mocker):
+    mocker.patch('freqtrade.main._CONF', conf_clone)
     mocker.patch.multiple('freqtrade.rpc.telegram',
-                          _CONF=default_conf,
+                          _CONF=conf_clone,
                           init=MagicMock())
-    default_conf['telegram']['enabled'] = True
+    conf_clone['telegram']['enabled'] = True
     bot = MagicMock()
     bot.send_message = MagicMock(side_effect=NetworkError('Oh snap'))
     send_msg('test', bot)